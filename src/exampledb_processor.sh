@@ -1,9 +1,9 @@
 #!/bin/bash
 
-# Just print the processed tile $1 into a file $2
+# Just print the processed tiles $2, $3... into a file $1
 
 FILE=$1
-TILE=$2
+shift
 
 if [ -f $FILE ]; then
    rm $FILE
@@ -12,5 +12,7 @@ else
    touch $FILE
 fi
 
-sleep 1s
-echo $(date)"\tDone with tile "$TILE".\n" >> $FILE
+for TILE in "$@"; do
+   sleep 1s
+   echo $(date)"\tDone with tile "$TILE".\n" >> $FILE
+done
@@ -56,6 +56,30 @@ class TestThreadProcessor:
         with pytest.raises(TypeError):
             result = {tile: r for tile, r in res}
 
+    def test_process_shutdown_on_exception(self):
+        tiles = tileconfig.FileTiles()
+        tiles.output = output.Output(dir=output.DirOutput(Path("/tmp")))
+        tiles.to_process = ["tile_1", "tile_2", "tile_3", "tile_4"]
+
+        def sample_worker(tile, **kwargs):
+            if tile == "tile_1":
+                raise ValueError(tile)
+            return True
+
+        threadprocessor = processor.factory.create(
+            "threadprocessor", name="test", tiles=tiles
+        )
+        threadprocessor.configure(
+            threads=2,
+            monitor_log=None,
+            monitor_interval=5,
+            worker=sample_worker,
+            config={},
+        )
+        with pytest.raises(ValueError):
+            threadprocessor.process()
+        assert threadprocessor._executor is None
+
     def test_process(self, caplog, generate_sample_processor):
         caplog.set_level(logging.INFO)
 
@@ -86,3 +110,11 @@ class TestThreadProcessor:
             if "Restarting" in rec.message
         ]
         assert len(restarts) == 3
+
+
+class TestBatchThreadProcessor:
+    @pytest.mark.parametrize(
+        "ntiles, nproc, chunksize", [(0, 4, 1), (10, 4, 1), (1000, 4, 62)]
+    )
+    def test_suggested_chunksize(self, ntiles, nproc, chunksize):
+        assert processor.suggested_chunksize(ntiles, nproc) == chunksize
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""Testing the process monitoring and logging."""
+
+import logging
+import sys
+
+import pytest
+
+from tile_processor import recorder
+
+
+@pytest.fixture(scope="function")
+def std_formatter():
+    return logging.Formatter(
+        fmt="%(asctime)s\t%(name)-24s\t%(lineno)s\t"
+        "[%(levelname)-8s]\t%(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
+def make_record(msg, args=None, exc_info=None):
+    return logging.LogRecord(
+        name="tile_processor.worker",
+        level=logging.INFO,
+        pathname=__file__,
+        lineno=42,
+        msg=msg,
+        args=args,
+        exc_info=exc_info,
+    )
+
+
+class TestFastFormatter:
+    def test_format(self, std_formatter):
+        formatter = recorder.FastFormatter()
+        messages = [
+            ("Running %s:%s", ("ThreedfierWorker", "25gn1_2")),
+            ("Done", None),
+        ]
+        for msg, args in messages:
+            expected = std_formatter.format(make_record(msg, args))
+            assert formatter.format(make_record(msg, args)) == expected
+
+    def test_format_exception(self, std_formatter):
+        try:
+            raise ValueError("tile")
+        except ValueError:
+            exc_info = sys.exc_info()
+        assert recorder.FastFormatter().format(
+            make_record("Failed", exc_info=exc_info)
+        ) == std_formatter.format(make_record("Failed", exc_info=exc_info))
@@ -128,6 +128,18 @@ class TestInit:
             feature_tiles=features_idx_sch,
         )
 
+    def test_runnable_ahntiles(self):
+        tiles = tileconfig.DbTilesAHN(
+            conn=None, elevation_tiles=None, feature_tiles=None
+        )
+        assert tiles.runnable_tiles() is None
+        tiles.elevation_file_index = {
+            "u1": [("/data/ahn3/u1.laz", 3)],
+            "u2": [],
+        }
+        assert tiles.runnable_tiles() == {"u1"}
+        assert tiles.tiles_with_elevation() is tiles.tiles_with_elevation()
+
 
 class TestExtent:
     """Configure the feature tiles with the provided polygonal extent."""
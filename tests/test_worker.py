@@ -5,10 +5,50 @@
 
 """Testing the worker module and the various Workers."""
 
+import logging
+import os
+import sys
+from time import time
+
 import pytest
+import yaml
 from pathlib import Path
+from types import SimpleNamespace
+
+from tile_processor import controller, recorder, worker, db, tileconfig, output
+
+
+@pytest.fixture(scope="function")
+def ahn_tiles():
+    """A DbTilesAHN that is configured without a database connection."""
+    conn = SimpleNamespace(
+        dbname="bag3d_db",
+        host="localhost",
+        port=5590,
+        user="bag3d_tester",
+        password="bag3d_test",
+    )
+    feature_tiles = SimpleNamespace(
+        features=db.Schema(
+            {
+                "schema": "bagactueel",
+                "table": "pandactueelbestaand",
+                "field": {"uniqueid": "identificatie"},
+            }
+        )
+    )
+    tiles = tileconfig.DbTilesAHN(
+        conn=conn, elevation_tiles=None, feature_tiles=feature_tiles
+    )
+    tiles.feature_views = {"25gn1_2": "t_25gn1_2"}
+    tiles.elevation_file_index = {
+        "25gn1_2": [
+            ("/data/ahn3/C25gn1_2.laz", 3),
+            ("/data/ahn2/u_2.laz", 2),
+        ]
+    }
+    yield tiles
 
-from tile_processor import controller, recorder
 
 @pytest.mark.integration_test
 class TestExample:
@@ -56,6 +96,218 @@ class TestExample:
         for part, failed in results.items():
             assert len(failed) == 0
 
+    def test_exampledb_batch(self, data_dir):
+        tiles = [
+            "all",
+        ]
+        threads = 3
+        fp = Path(data_dir) / "exampledb_config.yml"
+        configuration = fp.open("r", encoding="utf-8")
+        ctrl = controller.factory.create(
+            "Example",
+            configuration=configuration,
+            threads=threads,
+            monitor_log=None,
+            monitor_interval=None,
+        )
+        ctrl.configure(
+            tiles=tiles,
+            processor_key="batchthreadprocessor",
+            worker_key="ExampleDb",
+        )
+        results = ctrl.run()
+        for part, failed in results.items():
+            assert len(failed["failed_tiles"]) == 0
+
+
+class TestWorkerFactory:
+    def test_create_reuses_instance(self):
+        factory = worker.WorkerFactory()
+        factory.register_worker("3dfier", worker.ThreedfierWorker)
+        threedfier = factory.create("3dfier")
+        assert isinstance(threedfier, worker.ThreedfierWorker)
+        assert factory.create("3dfier") is threedfier
+        factory.register_worker("3dfier", worker.ThreedfierTINWorker)
+        assert isinstance(factory.create("3dfier"), worker.ThreedfierTINWorker)
+
+    def test_create_calls_function(self):
+        factory = worker.WorkerFactory()
+        factory.register_worker("3dfier", lambda: object())
+        assert factory.create("3dfier") is not factory.create("3dfier")
+
+    def test_register_instantiates_class(self):
+        instances = []
+
+        class CountingWorker:
+            def __init__(self):
+                instances.append(self)
+
+        factory = worker.WorkerFactory()
+        factory.register_worker("counting", CountingWorker)
+        assert len(instances) == 1
+        assert factory.create("counting") is instances[0]
+        assert factory.create("counting") is instances[0]
+        assert len(instances) == 1
+
+
+class TestRunSubprocess:
+    def test_stderr_tail(self, caplog):
+        caplog.set_level(logging.DEBUG)
+        command = [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "for i in range(50000): print(f'line {i}', file=sys.stderr)\n"
+            "sys.exit(1)",
+        ]
+        assert worker.run_subprocess(command, tile_id="t1") is False
+        stderr = [
+            r.message for r in caplog.records if "t1 stderr" in r.message
+        ]
+        assert "line 49999" in stderr[0]
+        assert "line 0\n" not in stderr[0]
+
+    def test_resolve_executable(self):
+        assert os.path.isabs(worker._resolve_executable("sh"))
+        assert worker._resolve_executable("bin/3dfier") == "bin/3dfier"
+
+    @pytest.mark.skipif(
+        not hasattr(os, "pidfd_open"), reason="requires os.pidfd_open"
+    )
+    def test_monitor_returns_on_exit(self):
+        monitor_log = logging.getLogger("test_monitor")
+        start = time()
+        success = worker.run_subprocess(
+            [sys.executable, "-c", "pass"],
+            monitor_log=monitor_log,
+            monitor_interval=10,
+            tile_id="t1",
+        )
+        assert success
+        assert time() - start < 5
+
+    def test_monitor_interval(self, caplog):
+        monitor_log = logging.getLogger("test_monitor_interval")
+        caplog.set_level(logging.INFO, logger=monitor_log.name)
+        success = worker.run_subprocess(
+            [sys.executable, "-c", "import time; time.sleep(1.1)"],
+            monitor_log=monitor_log,
+            monitor_interval=0.25,
+            tile_id="t1",
+        )
+        assert success
+        samples = [r for r in caplog.records if r.name == monitor_log.name]
+        assert 2 <= len(samples) <= 5
+
+
+class TestThreedfierWorker:
+    def test_create_yaml(self, ahn_tiles):
+        yml_text = worker.ThreedfierWorker().create_yaml(
+            tile="25gn1_2",
+            dbtilesahn=ahn_tiles,
+            ahn_paths=ahn_tiles.elevation_file_index["25gn1_2"],
+        )
+        yml = yaml.safe_load(yml_text)
+        polygons = yml["input_polygons"][0]
+        assert polygons["datasets"] == [
+            "PG:dbname=bag3d_db host=localhost port=5590 user=bag3d_tester "
+            "password=bag3d_test schemas=bagactueel tables=t_25gn1_2"
+        ]
+        assert polygons["uniqueid"] == "identificatie"
+        roof = yml["lifting_options"]["Building"]["roof"]
+        assert roof["use_LAS_classes"] == [1, 6]
+        assert yml["input_elevation"][0]["datasets"] == [
+            "/data/ahn3/C25gn1_2.laz",
+            "/data/ahn2/u_2.laz",
+        ]
+
+    def test_create_yaml_single_file(self, ahn_tiles):
+        yml_text = worker.ThreedfierWorker().create_yaml(
+            tile="25gn1_2",
+            dbtilesahn=ahn_tiles,
+            ahn_paths=[("/data/ahn3/C25gn1_2.laz", 3)],
+        )
+        yml = yaml.safe_load(yml_text)
+        roof = yml["lifting_options"]["Building"]["roof"]
+        assert roof["use_LAS_classes"] == [6]
+        assert yml["input_elevation"][0]["datasets"] == [
+            "/data/ahn3/C25gn1_2.laz"
+        ]
+
+    def test_create_yaml_tin(self, ahn_tiles):
+        yml_text = worker.ThreedfierTINWorker().create_yaml(
+            tile="25gn1_2",
+            dbtilesahn=ahn_tiles,
+            ahn_paths=ahn_tiles.elevation_file_index["25gn1_2"],
+            simplification_tinsimp=0.5,
+        )
+        yml = yaml.safe_load(yml_text)
+        assert yml["input_polygons"][0]["lifting"] == "Terrain"
+        terrain = yml["lifting_options"]["Terrain"]
+        assert terrain["simplification_tinsimp"] == 0.5
+        assert yml["input_elevation"][0]["datasets"] == [
+            "/data/ahn3/C25gn1_2.laz",
+            "/data/ahn2/u_2.laz",
+        ]
+
+    @pytest.mark.parametrize("exe_dir", ["bin", "path with spaces"])
+    def test_execute(self, ahn_tiles, tmp_path, exe_dir, monkeypatch):
+        """The configuration is passed to 3dfier and removed afterwards."""
+        config_dir = tmp_path / "config"
+        config_dir.mkdir()
+        monkeypatch.setattr(worker, "_CONFIG_DIR", str(config_dir))
+        ahn_tiles.output = output.Output(dir=output.DirOutput(tmp_path))
+        exe = tmp_path / exe_dir / "3dfier"
+        exe.parent.mkdir()
+        exe.write_text(
+            '#!/bin/sh\ngrep -q "lifting: Building" "$1" || exit 1\n'
+            f'[ "$(dirname "$1")" = "{config_dir}" ]\n'
+        )
+        exe.chmod(0o755)
+        success = worker.ThreedfierWorker().execute(
+            tile="25gn1_2",
+            tiles=ahn_tiles,
+            path_executable=str(exe),
+            monitor_log=None,
+            monitor_interval=None,
+        )
+        assert success
+        assert list(config_dir.iterdir()) == []
+
+
+class TestBuildingReconstructionAHN34CompareWorker:
+    def test_create_configuration(self, ahn_tiles):
+        ahn_tiles.elevation_file_index = {
+            "25gn1_2": [
+                {"version": 3, "file_list": ["/data/ahn3/C25gn1_2.laz"]},
+                {"version": 4, "file_list": ["/data/ahn4/C25gn1_2.laz"]},
+            ]
+        }
+        ahn_tiles.output = SimpleNamespace(
+            db=SimpleNamespace(
+                dsn_no_relation=lambda: "PG:dbname=out", schema="out"
+            ),
+            kwargs={"table_prefix": "t_"},
+            dir=None,
+        )
+        compare_worker = worker.BuildingReconstructionAHN34CompareWorker()
+        config = compare_worker.create_configuration(
+            tile="25gn1_2", tiles=ahn_tiles, kwargs={"run_reference": "v1"}
+        )
+        assert config[0].startswith(
+            "--INPUT_FOOTPRINT_SOURCE=PG:dbname=bag3d_db"
+        )
+        assert "--OUTPUT_DB_CONNECTION=PG:dbname=out" in config
+        assert "--OUTPUT_LAYERNAME_LOD22_3D_tri=out.t_lod22_3d_tri" in config
+        assert "--TILE_ID=25gn1_2" in config
+        assert config[-5:] == [
+            "--RUN_REFERENCE=v1",
+            "--INPUT_LAS_FILES_AHN3=",
+            "/data/ahn3/C25gn1_2.laz",
+            "--INPUT_LAS_FILES_AHN4=",
+            "/data/ahn4/C25gn1_2.laz",
+        ]
+
 
 @pytest.mark.integration_test
 class TestThreedfier:
@@ -154,3 +406,33 @@ class TestTileExporter:
         )
         lod13_controller.cfg["config"]["out_dir"] = output_dir
         lod13_controller.run()
+
+    def test_execute(self, ahn_tiles, tmp_path, caplog):
+        """Both the footprints and the point cloud are exported, and the
+        resource usage of the two processes is recorded separately."""
+        monitor_log = logging.getLogger("test_tile_exporter")
+        caplog.set_level(logging.INFO, logger=monitor_log.name)
+        exes = {}
+        for name in ("ogr2ogr", "lasmerge"):
+            exe = tmp_path / name
+            exe.write_text(
+                f'#!/bin/sh\necho "$@" > "{tmp_path}/{name}.out"\nsleep 0.5\n'
+            )
+            exe.chmod(0o755)
+            exes[name] = str(exe)
+        success = worker.TileExporter().execute(
+            tile="25gn1_2",
+            tiles=ahn_tiles,
+            path_lasmerge=exes["lasmerge"],
+            path_ogr2ogr=exes["ogr2ogr"],
+            out_dir=str(tmp_path),
+            monitor_log=monitor_log,
+            monitor_interval=0.1,
+        )
+        assert success
+        assert "25gn1_2.gpkg" in (tmp_path / "ogr2ogr.out").read_text()
+        assert "/data/ahn2/u_2.laz" in (tmp_path / "lasmerge.out").read_text()
+        monitored = {
+            r.args[0] for r in caplog.records if r.name == monitor_log.name
+        }
+        assert monitored == {"25gn1_2:ogr2ogr", "25gn1_2:lasmerge"}
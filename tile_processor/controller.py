@@ -18,6 +18,12 @@ from io import TextIOBase
 import yaml
 from click import echo, secho, exceptions
 
+try:
+    # The LibYAML bindings are only available if PyYAML was built with them
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 from tile_processor import processor, worker, tileconfig, db, output
 
 log = logging.getLogger(__name__)
@@ -62,7 +68,7 @@ class ConfigurationSchema:
                     return None
             try:
                 with open(src, "r") as cfgp:
-                    return yaml.load(cfgp, Loader=yaml.FullLoader)
+                    return yaml.load(cfgp, Loader=YamlLoader)
             except FileNotFoundError:
                 raise exceptions.ClickException(
                     message=f"The configuration schema '{name}' is registered, "
@@ -126,7 +132,7 @@ class ConfigurationSchema:
         if config is None:
             log.warning(f"config is None")
             return None
-        cfg = yaml.load(config, Loader=yaml.FullLoader)
+        cfg = yaml.load(config, Loader=YamlLoader)
         # if self.schema:
         #     try:
         #         c = pykwalify.core.Core(
@@ -284,7 +290,10 @@ class ExampleController(Controller):
             worker_init = worker.factory.create(worker_key)
         else:
             worker_init = worker_class
-        self.cfg["worker"] = worker_init.execute
+        if processor_key == "batchthreadprocessor":
+            self.cfg["worker"] = worker_init.execute_batch
+        else:
+            self.cfg["worker"] = worker_init.execute
 
         if worker_key == "Example":
             tilescfg = tileconfig.FileTiles()
@@ -71,6 +71,7 @@ class DbOutput:
             self.schema = None
         self.table = table
         self.dsn = None
+        self.__dsn_no_relation = None
 
     @property
     def dsn(self):
@@ -103,19 +104,25 @@ class DbOutput:
         self.__dsn = None
 
     def dsn_no_relation(self):
-        """Returns a DSN without schema and table specifier"""
-        # Create the dsn
-        _dsn = " ".join(
-            [
-                f"PG:dbname={self.conn.dbname}",
-                f"host={self.conn.host}",
-                f"port={self.conn.port}",
-                f"user={self.conn.user}",
-            ]
-        )
-        if self.conn.password is not None:
-            _dsn = " ".join([_dsn, f"password={self.conn.password}"])
-        return _dsn
+        """Returns a DSN without schema and table specifier.
+
+        The connection does not change, so the DSN is only created on the
+        first call, which saves rebuilding it for every tile.
+        """
+        if self.__dsn_no_relation is None:
+            # Create the dsn
+            _dsn = " ".join(
+                [
+                    f"PG:dbname={self.conn.dbname}",
+                    f"host={self.conn.host}",
+                    f"port={self.conn.port}",
+                    f"user={self.conn.user}",
+                ]
+            )
+            if self.conn.password is not None:
+                _dsn = " ".join([_dsn, f"password={self.conn.password}"])
+            self.__dsn_no_relation = _dsn
+        return self.__dsn_no_relation
 
     def with_table(self, table: str) -> str:
         """Returns a PostgreSQL DSN for GDAL with the table set to the value.
@@ -6,12 +6,27 @@ processing logic.
 """
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List
+from functools import partial
+from typing import List, Tuple
 from pprint import pformat
 
 log = logging.getLogger(__name__)
 
 
+def suggested_chunksize(ntiles: int, nproc: int) -> int:
+    """Number of tiles in a batch, so that each worker thread receives about
+    four batches.
+
+    Fewer, larger batches share the cost of launching the worker among more
+    tiles, while several batches per thread still balance the load when some
+    batches take longer than others.
+
+    :param ntiles: Number of tiles to process
+    :param nproc: Number of parallel workers
+    """
+    return max(1, ntiles // (nproc * 4))
+
+
 class ParallelProcessorFactory:
     """Registers and instantiates a ParallelProcessor that launches the
     Executors."""
@@ -37,7 +52,12 @@ class ParallelProcessorFactory:
 
 
 class ThreadProcessor:
-    """For multithreaded processing."""
+    """For multithreaded processing.
+
+    The workers spend nearly all their time waiting on the subprocess that
+    they launch, which releases the GIL, so threads give the same parallelism
+    as processes without the memory overhead of a Python process per worker.
+    """
 
     def __init__(self, name: str, tiles):
         self.name = name
@@ -45,6 +65,10 @@ class ThreadProcessor:
         self.cfg = None
         self.tiles = tiles
         self.worker = None
+        # The worker with the configuration bound, only the tile is passed
+        # per call
+        self._bound_worker = None
+        self._executor = None
 
     def configure(
         self,
@@ -83,6 +107,8 @@ class ThreadProcessor:
             "monitor_interval": monitor_interval,
         }
         self.worker = worker
+        self._bound_worker = partial(worker, **self.cfg, **self.worker_cfg)
+        self._shutdown()
         log.info(f"Configured {self.__class__.__name__}:{self.name}")
         # log.debug(pformat(vars(self)))
 
@@ -95,59 +121,144 @@ class ThreadProcessor:
         :return: The IDs of the tiles that failed even after the restarts
         """
         log.info(f"Running {self.__class__.__name__}:{self.name}")
-        proc_result = self._process()
-        failed_tiles = []
-        nr_success = 0
-        for tile, result in proc_result:
-            if result is False:
-                failed_tiles.append(tile)
-            else:
-                nr_success += 1
-        _restart = 0
-        while _restart < restart:
-            if failed_tiles is not None and len(failed_tiles) > 0:
-                _restart += 1
-                log.info(
-                    f"Restarting {self.__class__.__name__}:{self.name} "
-                    f"with {failed_tiles}"
-                )
-                self.tiles.to_process = failed_tiles
-                proc_result = self._process()
-                failed_tiles = []
-                for tile, result in proc_result:
-                    if result is False:
-                        failed_tiles.append(tile)
-                    else:
-                        nr_success += 1
-            else:
-                break
+        try:
+            proc_result = self._process()
+            failed_tiles = []
+            nr_success = 0
+            for tile, result in proc_result:
+                if result is False:
+                    failed_tiles.append(tile)
+                else:
+                    nr_success += 1
+            _restart = 0
+            while _restart < restart:
+                if failed_tiles is not None and len(failed_tiles) > 0:
+                    _restart += 1
+                    log.info(
+                        f"Restarting {self.__class__.__name__}:{self.name} "
+                        f"with {failed_tiles}"
+                    )
+                    self.tiles.to_process = failed_tiles
+                    proc_result = self._process()
+                    failed_tiles = []
+                    for tile, result in proc_result:
+                        if result is False:
+                            failed_tiles.append(tile)
+                        else:
+                            nr_success += 1
+                else:
+                    break
+        finally:
+            # The same threads were used for the restarts. Also wait for the
+            # submitted tiles and release the threads if a worker raised.
+            self._shutdown()
         log.info(f"Done {self.__class__.__name__}:{self.name}")
         return {'failed_tiles': failed_tiles, 'nr_success': nr_success}
 
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the thread pool of the processor, which is reused for
+        every round of :meth:`process`."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.cfg["threads"], thread_name_prefix=self.name
+            )
+        return self._executor
+
+    def _shutdown(self):
+        """Shut down the thread pool, waiting for the running workers."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _runnable(self) -> Tuple[List[str], List[str]]:
+        """Split the tiles to process into the ones that can be processed and
+        the ones that lack some input (eg. elevation data), so that no worker
+        is launched for the latter.
+
+        :return: The runnable and the skipped tiles
+        """
+        runnable_tiles = self.tiles.runnable_tiles()
+        if runnable_tiles is None:
+            return list(self.tiles.to_process), []
+        runnable, skipped = [], []
+        for tile in self.tiles.to_process:
+            if tile in runnable_tiles:
+                runnable.append(tile)
+            else:
+                log.debug("Tile %s is missing some input, skipping", tile)
+                skipped.append(tile)
+        return runnable, skipped
+
     def _process(self):
         """Runs the workers asynchronously, using a `ThreadPoolExecutor
         <https://docs.python.org/3.6/library/concurrent.futures.html#threadpoolexecutor>`_.
 
         :return: Yields the results from the worker.
         """
-        with ThreadPoolExecutor(max_workers=self.cfg["threads"]) as executor:
-            future_to_tile = {}
-            for tile in self.tiles.to_process:
-                self.worker_cfg["tile"] = tile
-                future_to_tile[
-                    executor.submit(self.worker, **self.cfg, **self.worker_cfg)
-                ] = tile
-            for future in as_completed(future_to_tile):
-                tile = future_to_tile[future]
-                try:
-                    # yield the data that is created/returned by the worker
-                    yield tile, future.result()
-                except Exception as e:
-                    log.exception(f"Tile {tile} raised an exception: {e}")
-                    raise
-                else:
-                    log.info(f"Done with tile {tile}")
+        tiles, skipped = self._runnable()
+        for tile in skipped:
+            yield tile, False
+        executor = self._get_executor()
+        future_to_tile = {}
+        for tile in tiles:
+            future = executor.submit(self._bound_worker, tile=tile)
+            future_to_tile[future] = tile
+        for future in as_completed(future_to_tile):
+            tile = future_to_tile[future]
+            try:
+                # yield the data that is created/returned by the worker
+                yield tile, future.result()
+            except Exception as e:
+                log.exception(f"Tile {tile} raised an exception: {e}")
+                raise
+            else:
+                log.info(f"Done with tile {tile}")
+
+
+class BatchThreadProcessor(ThreadProcessor):
+    """For multithreaded processing of the tiles in batches.
+
+    The worker is called once per batch, with the tile IDs of the batch in the
+    `tile_batch` argument, for example
+    :meth:`~.worker.ExampleDbWorker.execute_batch`. Thus the cost of
+    launching the worker is shared by the tiles in the batch.
+    """
+
+    # The maximum number of tiles in a batch
+    batch_size = 32
+
+    def _process(self):
+        """Runs the workers asynchronously on batches of tiles, using a
+        `ThreadPoolExecutor
+        <https://docs.python.org/3.6/library/concurrent.futures.html#threadpoolexecutor>`_.
+
+        :return: Yields the result of the batch for each tile in the batch.
+        """
+        tiles, skipped = self._runnable()
+        for tile in skipped:
+            yield tile, False
+        executor = self._get_executor()
+        chunksize = suggested_chunksize(len(tiles), self.cfg["threads"])
+        size = min(self.batch_size, chunksize)
+        future_to_batch = {}
+        for i in range(0, len(tiles), size):
+            batch = tiles[i : i + size]
+            future_to_batch[
+                executor.submit(self._bound_worker, tile_batch=batch)
+            ] = batch
+        for future in as_completed(future_to_batch):
+            batch = future_to_batch[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                log.exception(f"Tiles {batch} raised an exception: {e}")
+                raise
+            else:
+                log.info(f"Done with tiles {batch}")
+            for tile in batch:
+                yield tile, result
 
 
 factory = ParallelProcessorFactory()
 factory.register_processor("threadprocessor", ThreadProcessor)
+factory.register_processor("batchthreadprocessor", BatchThreadProcessor)
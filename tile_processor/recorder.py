@@ -2,9 +2,13 @@
 
 """Process monitoring and logging"""
 
+import atexit
 import logging
 import sys
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from typing import Optional
 
 from click import echo
@@ -14,21 +18,72 @@ import matplotlib.pyplot as plt
 log = logging.getLogger(__name__)
 
 
+class FastFormatter(logging.Formatter):
+    """Formats the records of the application log.
+
+    Produces the same output as a `logging.Formatter` with the format
+    ``"%(asctime)s\t%(name)-24s\t%(lineno)s\t[%(levelname)-8s]\t%(message)s"``
+    and the date format ``"%Y-%m-%d %H:%M:%S"``. But the record is assembled
+    directly instead of interpolating the format string, and the timestamp is
+    only formatted once per second.
+
+    Not thread-safe, it is meant for the handlers of the log listener thread.
+    """
+
+    default_time_format = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self):
+        super().__init__(datefmt=self.default_time_format)
+        self._cached_sec = None
+        self._cached_time = ""
+
+    def formatTime(self, record, datefmt=None) -> str:
+        sec = int(record.created)
+        if sec != self._cached_sec:
+            self._cached_time = time.strftime(
+                self.default_time_format, self.converter(sec)
+            )
+            self._cached_sec = sec
+        return self._cached_time
+
+    def format(self, record) -> str:
+        record.message = record.getMessage()
+        s = (
+            f"{self.formatTime(record)}\t{record.name:<24}\t{record.lineno}\t"
+            f"[{record.levelname:<8}]\t{record.message}"
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            s = f"{s}\n{record.exc_text}"
+        if record.stack_info:
+            s = f"{s}\n{self.formatStack(record.stack_info)}"
+        return s
+
+
+# Writes the log records of the application to the actual handlers
+_listener: Optional[QueueListener] = None
+
+
 def configure_logging(log_level_stream, filename: Optional[str] = None,
                       log_level_file=None):
     """Configures the general logging in the application
+
+    The loggers only put the records on a queue, and the records are written
+    to the stream and the file by a single listener thread. Thus the workers
+    do not block on the writes, nor on each other.
+
     :param log_level_file:
     """
+    global _listener
     handlers = []
     log_level_str = getattr(logging, log_level_stream.upper(), None)
 
     logger = logging.getLogger("tile_processor")
     logger.propagate = True
 
-    formatter = logging.Formatter(
-        fmt="%(asctime)s\t%(name)-24s\t%(lineno)s\t[%(levelname)-8s]\t%(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    # Only used by the listener thread
+    formatter = FastFormatter()
     if filename:
         f_handler = logging.FileHandler(filename, mode="w", encoding="utf-8")
         f_handler.setFormatter(formatter)
@@ -41,12 +96,32 @@ def configure_logging(log_level_stream, filename: Optional[str] = None,
     # logger.addHandler(c_handler)
     handlers.append(c_handler)
     # return logger
+    if _listener is not None:
+        _stop_listener()
+    else:
+        atexit.register(_stop_listener)
+    queue = SimpleQueue()
+    _listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # The records are formatted by the handlers of the listener
+    q_handler = QueueHandler(queue)
+    q_handler.setFormatter(logging.Formatter("%(message)s"))
     logging.basicConfig(
-        handlers=handlers,
+        handlers=[q_handler],
         level=log_level_stream
     )
 
 
+def _stop_listener():
+    """Write out the queued log records and remove the queue from the root
+    logger."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    _listener.stop()
+
+
 def configure_ressource_logging() -> logging.Logger:
     """Configures a logger for monitoring the resource usage of worker processes
 
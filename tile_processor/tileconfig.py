@@ -6,8 +6,9 @@
 import logging
 import os
 import re
+from functools import cached_property
 from random import shuffle
-from typing import Sequence, Tuple, Union, List, Mapping
+from typing import Sequence, Tuple, Union, List, Mapping, Optional, FrozenSet
 from abc import ABC, abstractmethod
 
 from psycopg2 import sql
@@ -32,6 +33,13 @@ class Tiles(ABC):
     def configure(self) -> None:
         pass
 
+    def runnable_tiles(self) -> Optional[FrozenSet[str]]:
+        """The tiles that have all the input data for processing.
+
+        :return: None if every tile can be processed
+        """
+        return None
+
 
 class FileTiles(Tiles):
     """Configures the tiles and tile index that is stored in files."""
@@ -275,6 +283,7 @@ class DbTilesAHN(Tiles):
         self.feature_tiles = feature_tiles
         self.elevation_file_index = None  # { feature tile ID: [ (matching AHN file path, AHN version), ... ] }
         self.feature_views = None
+        self.__tiles_with_elevation = None
 
     def configure(
         self,
@@ -303,6 +312,7 @@ class DbTilesAHN(Tiles):
                 `None`, no limitation.
             """
         self.feature_views = dict()
+        self.__tiles_with_elevation = None
         # Select the tiles of the footprints to be processed with either a
         # list of tile IDs or a polygon extent
         self.feature_tiles.configure(tiles=tiles, extent=extent)
@@ -392,6 +402,44 @@ class DbTilesAHN(Tiles):
                 f"version:{version}, on_border:{on_border}."
             )
 
+    def tiles_with_elevation(self) -> FrozenSet[str]:
+        """The tiles that have at least one elevation file.
+
+        Computed from the :attr:`elevation_file_index` on the first call, and
+        cached until the next :meth:`configure`.
+        """
+        if self.__tiles_with_elevation is None:
+            self.__tiles_with_elevation = frozenset(
+                tile
+                for tile, paths in self.elevation_file_index.items()
+                if paths
+            )
+        return self.__tiles_with_elevation
+
+    def runnable_tiles(self) -> Optional[FrozenSet[str]]:
+        """Only the tiles with elevation data can be processed."""
+        if self.elevation_file_index is None:
+            return None
+        return self.tiles_with_elevation()
+
+    @cached_property
+    def dsn_prefix(self) -> str:
+        """The tile-independent part of the GDAL PostgreSQL connection
+        string of the features, that is, everything except ``tables=``.
+
+        The connection and the feature schema do not change during a run, thus
+        the prefix is only created once. Append
+        ``f" tables={self.feature_views[tile]}"`` to get the DSN of a tile.
+        """
+        conn = self.conn
+        dsn = (
+            f"PG:dbname={conn.dbname} host={conn.host} "
+            f"port={conn.port} user={conn.user}"
+        )
+        if conn.password:
+            dsn += f" password={conn.password}"
+        return f"{dsn} schemas={self.feature_tiles.features.schema.string}"
+
     @staticmethod
     def create_elevation_file_index(directory_mapping: Mapping) -> dict:
         """Create an index of files in the given directories.
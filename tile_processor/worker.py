@@ -10,18 +10,113 @@ The Factory-pattern reference: `https://realpython.com/factory-method-python/
 
 import os
 import logging
+import selectors
+import shutil
+from string import Template
 from locale import getpreferredencoding
-from subprocess import PIPE
-from typing import Sequence, List
-from time import time, sleep
-
-from psutil import Popen, STATUS_ZOMBIE, STATUS_SLEEPING
-import yaml
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from subprocess import Popen, PIPE
+from tempfile import NamedTemporaryFile
+from threading import Thread
+from typing import Sequence, List, Tuple, IO, Iterator, Callable
+from textwrap import dedent
+from time import monotonic, time, sleep
 
 from tile_processor.tileconfig import DbTilesAHN
 
 log = logging.getLogger(__name__)
 
+# Resource monitoring, one record per sample: tile, pid, user CPU time,
+# system CPU time, RSS. See recorder.parse_log.
+_MONITOR_RECORD = "%s\t%s\t%s\t%s\t%s"
+# Decoding the output of the subprocesses. Not resetting the locale, because
+# setlocale() is process-global and not thread-safe.
+_ENCODING = getpreferredencoding(do_setlocale=False)
+# The tail of the STDOUT and STDERR of a subprocess that is kept for the log,
+# in chunks of characters
+_TAIL_CHUNK_SIZE = 4096
+_TAIL_CHUNKS = 64
+# Directory for the per-tile configuration files of the subprocesses. It is
+# memory-backed where available, otherwise the default temporary directory.
+_CONFIG_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+_PROCFS = os.path.exists("/proc/self/stat")
+if _PROCFS:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGESIZE = os.sysconf("SC_PAGESIZE")
+
+# The LAS classes of the buildings in the various AHN versions
+_LAS_BUILDING_CLASSES = {
+    frozenset({2}): "[1]",
+    frozenset({3}): "[6]",
+    frozenset({2, 3}): "[1, 6]",
+}
+
+# The 3dfier configurations are only rendered per tile, thus they are compiled
+# once. The elevation files are a YAML list, see _format_paths.
+_THREEDFIER_BUILDING_YAML = Template(
+    dedent(
+        """\
+    input_polygons:
+      - datasets:
+          - "$dsn"
+        uniqueid: $uniqueid
+        lifting: Building
+
+    lifting_options:
+      Building:
+        roof:
+          height: percentile-95
+          use_LAS_classes: $las_building
+        ground:
+          height: percentile-10
+          use_LAS_classes: [2]
+
+    input_elevation:
+      - datasets:
+          $ahn_file
+        omit_LAS_classes:
+        thinning: 0
+
+    options:
+      building_radius_vertex_elevation: 0.5
+      radius_vertex_elevation: 0.5
+      threshold_jump_edges: 0.5
+    """
+    )
+)
+_THREEDFIER_TIN_YAML = Template(
+    dedent(
+        """\
+    input_polygons:
+      - datasets:
+          - "$dsn"
+        uniqueid: $uniqueid
+        lifting: Terrain
+
+    lifting_options:
+      Terrain:
+        simplification_tinsimp: $simplification_tinsimp
+        inner_buffer: 0.1
+        use_LAS_classes:
+          - 2
+
+    input_elevation:
+      - datasets:
+          $ahn_file
+        omit_LAS_classes:
+        thinning: 0
+
+    options:
+      building_radius_vertex_elevation: 0.5
+      radius_vertex_elevation: 0.5
+      threshold_jump_edges: 0.5
+    """
+    )
+)
+
 # TODO BD: might be worth to make a Worker parent class with the run_subprocess
 # method in it. On the other hand, not every Worker might need a subprocess
 # runner
@@ -36,6 +131,7 @@ class WorkerFactory:
 
     def __init__(self):
         self._executors = {}
+        self._instances = {}
 
     def register_worker(self, key, worker):
         """Register a worker for use.
@@ -45,12 +141,25 @@ class WorkerFactory:
             `.__call__()`
         """
         self._executors[key] = worker
+        # Worker classes are instantiated once, when they are registered
+        if isinstance(worker, type):
+            self._instances[key] = worker()
+        else:
+            self._instances.pop(key, None)
 
     def create(self, key, **kwargs):
-        """Instantiate a worker"""
+        """Instantiate a worker.
+
+        Workers must not keep per-tile state, everything that is specific to
+        a tile is passed to their `execute` method. Therefore, when a worker
+        class is created without `kwargs`, the same instance is returned on
+        every call. Other callables are called on every call.
+        """
         worker = self._executors.get(key)
         if not worker:
             raise ValueError(key)
+        if not kwargs and key in self._instances:
+            return self._instances[key]
         return worker(**kwargs)
 
 
@@ -65,7 +174,7 @@ class ExampleWorker:
 
         :return: True/False on success/failure
         """
-        log.debug(f"Running {self.__class__.__name__}:{tile}")
+        log.debug("Running %s:%s", self.__class__.__name__, tile)
         package_dir = os.path.dirname(os.path.dirname(__file__))
         exe = os.path.join(package_dir, "src", "simulate_memory_use.sh")
         command = ["bash", exe, "5s"]
@@ -88,278 +197,212 @@ class ExampleDbWorker:
 
         :return: True/False on success/failure
         """
-        log.debug(f"Running {self.__class__.__name__}:{tile}")
-        package_dir = os.path.dirname(os.path.dirname(__file__))
-        exe = os.path.join(package_dir, "src", "exampledb_processor.sh")
-        command = ["bash", exe, "exampledb.output", tile]
+        log.debug("Running %s:%s", self.__class__.__name__, tile)
         res = run_subprocess(
-            command,
+            self._command([tile]),
             monitor_log=monitor_log,
             monitor_interval=monitor_interval,
             tile_id=tile,
         )
         return res
 
+    def execute_batch(
+        self, monitor_log, monitor_interval, tile_batch, **ignore
+    ) -> bool:
+        """Execute the TemplateWorker on a batch of tiles.
 
-class ThreedfierWorker:
-    """Runs 3dfier."""
+        The script is started only once for the whole batch, so the tiles
+        share the cost of launching the process. Use it with the
+        :class:`~.processor.BatchThreadProcessor`.
 
-    def create_yaml(self, tile, dbtilesahn, ahn_paths):
-        """Create the YAML configuration for 3dfier."""
-        ahn_file = ""
-        if len(ahn_paths) > 1:
-            for p, v in ahn_paths:
-                ahn_file += "- " + p + "\n" + "              "
-        else:
-            ahn_file += "- " + ahn_paths[0]
-        ahn_version = set([version for path, version in ahn_paths])
-
-        if dbtilesahn.conn.password:
-            d = "PG:dbname={dbname} host={host} port={port} user={user} password={pw} schemas={schema_tiles} tables={bag_tile}"
-            dsn = d.format(
-                dbname=dbtilesahn.conn.dbname,
-                host=dbtilesahn.conn.host,
-                port=dbtilesahn.conn.port,
-                user=dbtilesahn.conn.user,
-                pw=dbtilesahn.conn.password,
-                schema_tiles=dbtilesahn.feature_tiles.features.schema.string,
-                bag_tile=dbtilesahn.feature_views[tile],
-            )
-        else:
-            d = "PG:dbname={dbname} host={host} port={port} user={user} schemas={schema_tiles} tables={bag_tile}"
-            dsn = d.format(
-                dbname=dbtilesahn.conn.dbname,
-                host=dbtilesahn.conn.host,
-                port=dbtilesahn.conn.port,
-                user=dbtilesahn.conn.user,
-                schema_tiles=dbtilesahn.feature_tiles.features.schema.string,
-                bag_tile=dbtilesahn.feature_views[tile],
-            )
+        :return: True/False on success/failure of the whole batch
+        """
+        tile_id = ",".join(tile_batch)
+        log.debug("Running %s:%s", self.__class__.__name__, tile_id)
+        res = run_subprocess(
+            self._command(tile_batch),
+            monitor_log=monitor_log,
+            monitor_interval=monitor_interval,
+            tile_id=tile_id,
+        )
+        return res
 
-        if ahn_version == {2}:
-            las_building = [1]
-        elif ahn_version == {3}:
-            las_building = [6]
-        elif ahn_version == {2, 3}:
-            las_building = [1, 6]
-        else:
-            las_building = None
-        uniqueid = dbtilesahn.feature_tiles.features.field.uniqueid.string
+    @staticmethod
+    def _command(tiles: Sequence[str]) -> List[str]:
+        package_dir = os.path.dirname(os.path.dirname(__file__))
+        exe = os.path.join(package_dir, "src", "exampledb_processor.sh")
+        return ["bash", exe, "exampledb.output", *tiles]
 
-        yml = yaml.load(
-            f"""
-        input_polygons:
-          - datasets:
-              - "{dsn}"
-            uniqueid: {uniqueid}
-            lifting: Building
-
-        lifting_options:
-          Building:
-            roof:
-              height: percentile-95
-              use_LAS_classes: {las_building}
-            ground:
-              height: percentile-10
-              use_LAS_classes: [2]
-
-        input_elevation:
-          - datasets:
-              {ahn_file}
-            omit_LAS_classes:
-            thinning: 0
-
-        options:
-          building_radius_vertex_elevation: 0.5
-          radius_vertex_elevation: 0.5
-          threshold_jump_edges: 0.5
-        """,
-            yaml.FullLoader,
-        )
-        return yml
+
+def _format_paths(
+    ahn_paths: Sequence[Tuple[str, int]], indent: int = 6
+) -> str:
+    """Format the elevation file paths as the items of a YAML block sequence.
+
+    The first item is not indented, because the templates place it.
+
+    :param ahn_paths: The (path, AHN version) tuples of the tile
+    :param indent: The indentation of the items in the configuration
+    """
+    return ("\n" + " " * indent).join(f"- {p}" for p, _ in ahn_paths)
+
+
+class Threedfier:
+    """Runs 3dfier with a per-tile YAML configuration.
+
+    Subclasses create the configuration and the command line, this class
+    writes the configuration to a temporary file and runs the command.
+    """
+
+    def create_yaml(
+        self, tile: str, dbtilesahn: DbTilesAHN, ahn_paths, **kwargs
+    ) -> str:
+        """Create the YAML configuration for 3dfier.
+
+        :return: The configuration as YAML text
+        """
+        pass
+
+    def create_command(
+        self,
+        tile: str,
+        tiles: DbTilesAHN,
+        path_executable: str,
+        path_yml: str,
+        **kwargs,
+    ) -> List[str]:
+        """Create the command line for running 3dfier on a tile.
+
+        :param path_yml: Path to the configuration file of the tile
+        """
+        pass
 
     def execute(
         self,
-        tile,
-        tiles,
-        path_executable,
-        monitor_log,
-        monitor_interval,
-        **ignore,
+        tile: str,
+        tiles: DbTilesAHN,
+        path_executable: str,
+        monitor_log: logging.Logger,
+        monitor_interval: int,
+        **kwargs,
     ) -> bool:
-        """
+        """Execute 3dfier.
 
-        :param tile:
+        :param tile: Tile ID to process
         :param tiles: DbTilesAHN object
-        :param path_executable:
+        :param path_executable: Absolute path to the 3dfier exe
         :param monitor_log:
         :param monitor_interval:
-        :param ignore:
-        :return:
+        :param kwargs: Passed on to :meth:`create_yaml` and
+            :meth:`create_command`
+        :return: Success or Failure
         """
-        log.debug(f"Running {self.__class__.__name__}:{tile}")
+        log.debug("Running %s:%s", self.__class__.__name__, tile)
         if len(tiles.elevation_file_index[tile]) == 0:
-            log.debug(f"Elevation files are not available for tile {tile}")
+            log.debug("Elevation files are not available for tile %s", tile)
             return False
-        else:
-            yml = self.create_yaml(
-                tile=tile,
-                dbtilesahn=tiles,
-                ahn_paths=tiles.elevation_file_index[tile],
-            )
-            yml_path = str(tiles.output.dir.join_path(f"{tile}.yml"))
-            try:
-                with open(yml_path, "w") as fo:
-                    yaml.dump(yml, fo)
-            except BaseException as e:
-                log.exception(f"Error: cannot write {yml_path}")
-
-            output_path = str(tiles.output.dir.join_path(f"{tile}.csv"))
-            command = [
-                path_executable,
-                yml_path,
-                "--stat_RMSE",
-                "--CSV-BUILDINGS-MULTIPLE",
-                output_path,
-            ]
-            try:
-                success = run_subprocess(
+        yml = self.create_yaml(
+            tile=tile,
+            dbtilesahn=tiles,
+            ahn_paths=tiles.elevation_file_index[tile],
+            **kwargs,
+        )
+        try:
+            # The configuration file is removed when it is closed
+            with NamedTemporaryFile(
+                mode="w",
+                prefix=f"{tile}_",
+                suffix=".yml",
+                dir=_CONFIG_DIR,
+            ) as fo:
+                log.debug("%s\n%s", fo.name, yml)
+                fo.write(yml)
+                fo.flush()
+                command = self.create_command(
+                    tile=tile,
+                    tiles=tiles,
+                    path_executable=path_executable,
+                    path_yml=fo.name,
+                    **kwargs,
+                )
+                return run_subprocess(
                     command,
-                    shell=True,
                     doexec=True,
                     monitor_log=monitor_log,
                     monitor_interval=monitor_interval,
                     tile_id=tile,
                 )
-                return success
-            except BaseException as e:
-                log.exception("Cannot run 3dfier on tile %s", tile)
-                return False
-            finally:
-                try:
-                    os.remove(yml_path)
-                except Exception as e:
-                    log.error(e)
-
-
-class ThreedfierTINWorker:
-    def create_yaml(self, tile, dbtilesahn, ahn_paths, simplification_tinsimp):
-        """Create the YAML configuration for 3dfier."""
-        ahn_file = ""
-        if len(ahn_paths) > 1:
-            for p, v in ahn_paths:
-                ahn_file += "- " + p + "\n" + "              "
-        else:
-            ahn_file += "- " + ahn_paths[0]
-
-        if dbtilesahn.conn.password:
-            d = "PG:dbname={dbname} host={host} port={port} user={user} password={pw} schemas={schema_tiles} tables={bag_tile}"
-            dsn = d.format(
-                dbname=dbtilesahn.conn.dbname,
-                host=dbtilesahn.conn.host,
-                port=dbtilesahn.conn.port,
-                user=dbtilesahn.conn.user,
-                pw=dbtilesahn.conn.password,
-                schema_tiles=dbtilesahn.feature_tiles.features.schema.string,
-                bag_tile=dbtilesahn.feature_views[tile],
-            )
-        else:
-            d = "PG:dbname={dbname} host={host} port={port} user={user} schemas={schema_tiles} tables={bag_tile}"
-            dsn = d.format(
-                dbname=dbtilesahn.conn.dbname,
-                host=dbtilesahn.conn.host,
-                port=dbtilesahn.conn.port,
-                user=dbtilesahn.conn.user,
-                schema_tiles=dbtilesahn.feature_tiles.features.schema.string,
-                bag_tile=dbtilesahn.feature_views[tile],
-            )
+        except BaseException:
+            log.exception("Cannot run 3dfier on tile %s", tile)
+            return False
+
+
+class ThreedfierWorker(Threedfier):
+    """Runs 3dfier."""
+
+    def create_yaml(self, tile, dbtilesahn, ahn_paths, **ignore):
+        ahn_version = {v for _, v in ahn_paths}
+
+        dsn = (
+            f"{dbtilesahn.dsn_prefix} "
+            f"tables={dbtilesahn.feature_views[tile]}"
+        )
+        uniqueid = dbtilesahn.feature_tiles.features.field.uniqueid.string
+        las_building = _LAS_BUILDING_CLASSES.get(frozenset(ahn_version), "")
+        ahn_file = _format_paths(ahn_paths)
+
+        return _THREEDFIER_BUILDING_YAML.substitute(
+            dsn=dsn,
+            uniqueid=uniqueid,
+            las_building=las_building,
+            ahn_file=ahn_file,
+        )
+
+    def create_command(self, tile, tiles, path_executable, path_yml, **ignore):
+        output_path = str(tiles.output.dir.join_path(f"{tile}.csv"))
+        return [
+            path_executable,
+            path_yml,
+            "--stat_RMSE",
+            "--CSV-BUILDINGS-MULTIPLE",
+            output_path,
+        ]
 
+
+class ThreedfierTINWorker(Threedfier):
+    """Runs 3dfier for creating a TIN of the terrain."""
+
+    def create_yaml(
+        self, tile, dbtilesahn, ahn_paths, simplification_tinsimp, **ignore
+    ):
+        dsn = (
+            f"{dbtilesahn.dsn_prefix} "
+            f"tables={dbtilesahn.feature_views[tile]}"
+        )
         uniqueid = dbtilesahn.feature_tiles.features.field.uniqueid.string
+        ahn_file = _format_paths(ahn_paths)
 
-        simplification_tinsimp = str(simplification_tinsimp)
-        yml = yaml.load(
-            f"""
-        input_polygons:
-          - datasets:
-              - "{dsn}"
-            uniqueid: {uniqueid}
-            lifting: Terrain
-
-        lifting_options:
-          Terrain:
-            simplification_tinsimp: {simplification_tinsimp}
-            inner_buffer: 0.1
-            use_LAS_classes:
-              - 2
-
-        input_elevation:
-          - datasets:
-              {ahn_file}
-            omit_LAS_classes:
-            thinning: 0
-
-        options:
-          building_radius_vertex_elevation: 0.5
-          radius_vertex_elevation: 0.5
-          threshold_jump_edges: 0.5
-        """,
-            yaml.FullLoader,
+        return _THREEDFIER_TIN_YAML.substitute(
+            dsn=dsn,
+            uniqueid=uniqueid,
+            simplification_tinsimp=simplification_tinsimp,
+            ahn_file=ahn_file,
         )
-        return yml
 
-    def execute(
+    def create_command(
         self,
         tile,
         tiles,
-        simplification_tinsimp,
+        path_executable,
+        path_yml,
         out_format,
         out_format_ext,
-        path_executable,
-        monitor_log,
-        monitor_interval,
         **ignore,
-    ) -> bool:
-        log.debug(f"Running {self.__class__.__name__}:{tile}")
-        if len(tiles.elevation_file_index[tile]) == 0:
-            log.debug(f"Elevation files are not available for tile {tile}")
-            return False
-        else:
-            yml = self.create_yaml(
-                tile=tile,
-                dbtilesahn=tiles,
-                ahn_paths=tiles.elevation_file_index[tile],
-                simplification_tinsimp=simplification_tinsimp,
-            )
-            yml_path = str(tiles.output.dir.join_path(f"{tile}.yml"))
-            log.debug(f"{yml_path}\n{yml}")
-            try:
-                with open(yml_path, "w") as fo:
-                    yaml.dump(yml, fo)
-            except BaseException as e:
-                log.exception(f"Error: cannot write {yml_path}")
-
-            output_path = str(
-                tiles.output.dir.join_path(f"{tile}.{out_format_ext}")
-            )
-            command = [path_executable, yml_path, out_format, output_path]
-            try:
-                success = run_subprocess(
-                    command,
-                    shell=True,
-                    doexec=True,
-                    monitor_log=monitor_log,
-                    monitor_interval=monitor_interval,
-                    tile_id=tile,
-                )
-                return success
-            except BaseException as e:
-                log.exception("Cannot run 3dfier on tile %s", tile)
-                return False
-            finally:
-                try:
-                    os.remove(yml_path)
-                except Exception as e:
-                    log.error(e)
+    ):
+        output_path = str(
+            tiles.output.dir.join_path(f"{tile}.{out_format_ext}")
+        )
+        return [path_executable, path_yml, out_format, output_path]
 
 
 class Geoflow:
@@ -393,9 +436,9 @@ class Geoflow:
         :param doexec:
         :return: Success or Failure
         """
-        log.debug(f"Running {self.__class__.__name__}:{tile}")
+        log.debug("Running %s:%s", self.__class__.__name__, tile)
         if len(tiles.elevation_file_index[tile]) == 0:
-            log.debug(f"Elevation files are not available for tile {tile}")
+            log.debug("Elevation files are not available for tile %s", tile)
             return False
         kwargs = {"run_reference": run_reference}
         config = self.create_configuration(tile=tile, tiles=tiles, kwargs=kwargs)
@@ -412,7 +455,6 @@ class Geoflow:
             try:
                 success = run_subprocess(
                     command,
-                    shell=False,
                     doexec=doexec,
                     monitor_log=monitor_log,
                     monitor_interval=monitor_interval,
@@ -431,16 +473,7 @@ class Geoflow:
 class BuildingReconstructionWorker(Geoflow):
     def create_configuration(self, tile: str, tiles: DbTilesAHN, kwargs):
         # Create the Postgres connection string
-        dsn_in = (
-            f"PG:dbname={tiles.conn.dbname} "
-            f"host={tiles.conn.host} "
-            f"port={tiles.conn.port} "
-            f"user={tiles.conn.user} "
-            f"schemas={tiles.feature_tiles.features.schema.string} "
-            f"tables={tiles.feature_views[tile]}"
-        )
-        if tiles.conn.password:
-            dsn_in += f" password={tiles.conn.password}"
+        dsn_in = f"{tiles.dsn_prefix} tables={tiles.feature_views[tile]}"
         # Select the las file paths for the tile
         input_las_files = []
         for ahn_tile in tiles.elevation_file_index[tile]:
@@ -480,19 +513,31 @@ class BuildingReconstructionWorker(Geoflow):
 
         return config
 
+# The options of the AHN3-AHN4 comparison flowchart that are set for every
+# tile, rendered with the values of the tile by format_map
+_AHN34_COMPARE_ARGS = (
+    "--INPUT_FOOTPRINT_SOURCE={dsn_in}",
+    "--overwrite_output=false",
+    "--OUTPUT_DB_CONNECTION={dsn_out}",
+    "--OUTPUT_LAYERNAME_LOD11_2D={out_layer_template}lod11_2d",
+    "--OUTPUT_LAYERNAME_LOD12_2D={out_layer_template}lod12_2d",
+    "--OUTPUT_LAYERNAME_LOD12_3D={out_layer_template}lod12_3d",
+    "--OUTPUT_LAYERNAME_LOD13_2D={out_layer_template}lod13_2d",
+    "--OUTPUT_LAYERNAME_LOD13_3D={out_layer_template}lod13_3d",
+    "--OUTPUT_LAYERNAME_LOD22_2D={out_layer_template}lod22_2d",
+    "--OUTPUT_LAYERNAME_LOD22_3D={out_layer_template}lod22_3d",
+    "--OUTPUT_LAYERNAME_LOD12_3D_tri={out_layer_template}lod12_3d_tri",
+    "--OUTPUT_LAYERNAME_LOD13_3D_tri={out_layer_template}lod13_3d_tri",
+    "--OUTPUT_LAYERNAME_LOD22_3D_tri={out_layer_template}lod22_3d_tri",
+    "--TILE_ID={tile}",
+    "--OUTPUT_FORMAT={format_out}",
+)
+
+
 class BuildingReconstructionAHN34CompareWorker(Geoflow):
     def create_configuration(self, tile: str, tiles: DbTilesAHN, kwargs):
         # Create the Postgres connection string
-        dsn_in = (
-            f"PG:dbname={tiles.conn.dbname} "
-            f"host={tiles.conn.host} "
-            f"port={tiles.conn.port} "
-            f"user={tiles.conn.user} "
-            f"schemas={tiles.feature_tiles.features.schema.string} "
-            f"tables={tiles.feature_views[tile]}"
-        )
-        if tiles.conn.password:
-            dsn_in += f" password={tiles.conn.password}"
+        dsn_in = f"{tiles.dsn_prefix} tables={tiles.feature_views[tile]}"
         # Select the las file paths for the tile
         input_las_files_ahn3 = []
         input_las_files_ahn4 = []
@@ -508,41 +553,18 @@ class BuildingReconstructionAHN34CompareWorker(Geoflow):
                 out_layer_template = f"{tiles.output.db.schema}.{tiles.output.kwargs.get('table_prefix', '')}"
             else:
                 out_layer_template = tiles.output.kwargs.get("table_prefix", "")
-            t_lod11_2d = out_layer_template + "lod11_2d"
-            t_lod12_2d = out_layer_template + "lod12_2d"
-            t_lod12_3d = out_layer_template + "lod12_3d"
-            t_lod13_2d = out_layer_template + "lod13_2d"
-            t_lod13_3d = out_layer_template + "lod13_3d"
-            t_lod22_2d = out_layer_template + "lod22_2d"
-            t_lod22_3d = out_layer_template + "lod22_3d"
-            t_lod12_3d_tri = out_layer_template + "lod12_3d_tri"
-            t_lod13_3d_tri = out_layer_template + "lod13_3d_tri"
-            t_lod22_3d_tri = out_layer_template + "lod22_3d_tri"
             format_out = "PostgreSQL"
         else:
             raise ValueError(f"Invalid Output type {type(tiles.output)}")
         # Put together the configuration
-        config = []
-        config.append(f"--INPUT_FOOTPRINT_SOURCE={dsn_in}")
-
-        config.append(f"--overwrite_output=false")
-
-        config.append(f"--OUTPUT_DB_CONNECTION={dsn_out}")
-
-        config.append(f"--OUTPUT_LAYERNAME_LOD11_2D={t_lod11_2d}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD12_2D={t_lod12_2d}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD12_3D={t_lod12_3d}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD13_2D={t_lod13_2d}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD13_3D={t_lod13_3d}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD22_2D={t_lod22_2d}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD22_3D={t_lod22_3d}")
-
-        config.append(f"--OUTPUT_LAYERNAME_LOD12_3D_tri={t_lod12_3d_tri}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD13_3D_tri={t_lod13_3d_tri}")
-        config.append(f"--OUTPUT_LAYERNAME_LOD22_3D_tri={t_lod22_3d_tri}")
-
-        config.append(f"--TILE_ID={tile}")
-        config.append(f"--OUTPUT_FORMAT={format_out}")
+        values = {
+            "dsn_in": dsn_in,
+            "dsn_out": dsn_out,
+            "out_layer_template": out_layer_template,
+            "tile": tile,
+            "format_out": format_out,
+        }
+        config = [arg.format_map(values) for arg in _AHN34_COMPARE_ARGS]
         if tiles.output.dir is not None and "obj" in tiles.output.dir:
             config.append(f"--OUTPUT_OBJ_DIR={tiles.output.dir['obj'].path}")
         if tiles.output.dir is not None and "cityjson" in tiles.output.dir:
@@ -561,16 +583,7 @@ class BuildingReconstructionAHN34CompareWorker(Geoflow):
 class PCRasteriserWorker(Geoflow):
     def create_configuration(self, tile: str, tiles: DbTilesAHN, kwargs):
         # Create the Postgres connection string
-        dsn_in = (
-            f"PG:dbname={tiles.conn.dbname} "
-            f"host={tiles.conn.host} "
-            f"port={tiles.conn.port} "
-            f"user={tiles.conn.user} "
-            f"schemas={tiles.feature_tiles.features.schema.string} "
-            f"tables={tiles.feature_views[tile]}"
-        )
-        if tiles.conn.password:
-            dsn_in += f" password={tiles.conn.password}"
+        dsn_in = f"{tiles.dsn_prefix} tables={tiles.feature_views[tile]}"
         # Select the las file paths for the tile
         input_las_files = [p[0] for p in tiles.elevation_file_index[tile]]
         # Put together the configuration
@@ -611,6 +624,13 @@ class AlphaShapeWorker(Geoflow):
 
 
 class TileExporter:
+    """Exports the footprints of a tile to GeoPackage with ogr2ogr and merges
+    its point cloud files with lasmerge.
+
+    The two exports of a tile run at the same time, thus a processor with
+    `N` threads runs up to `2N` external processes.
+    """
+
     def execute(
         self,
         tile: str,
@@ -623,88 +643,181 @@ class TileExporter:
         doexec: bool = True,
         **ignore,
     ) -> bool:
-        log.debug(f"Running {self.__class__.__name__}:{tile}")
-        results = []
+        log.debug("Running %s:%s", self.__class__.__name__, tile)
         # Create the Postgres connection string
-        dsn_in = (
-            f"PG:dbname={tiles.conn.dbname} "
-            f"host={tiles.conn.host} "
-            f"port={tiles.conn.port} "
-            f"user={tiles.conn.user} "
-            f"schemas={tiles.feature_tiles.features.schema.string} "
-            f"tables={tiles.feature_views[tile]}"
-        )
-        if tiles.conn.password:
-            dsn_in += f" password={tiles.conn.password}"
+        dsn_in = f"{tiles.dsn_prefix} tables={tiles.feature_views[tile]}"
         # Select the las file paths for the tile
         input_las_files = [p[0] for p in tiles.elevation_file_index[tile]]
 
         if len(tiles.elevation_file_index[tile]) == 0:
-            log.debug(f"Elevation files are not available for tile {tile}")
+            log.debug("Elevation files are not available for tile %s", tile)
             return False
 
-        log.debug(f"Exporting footprints to GPKG:{tile}")
         # FIXME: this doesnt work on windows
-        command = [
+        command_gpkg = [
             path_ogr2ogr,
             "-f",
             "GPKG",
             f"{out_dir}/{tile}.gpkg",
             dsn_in,
         ]
-        try:
-            success = run_subprocess(
-                command,
-                shell=False,
-                doexec=doexec,
-                monitor_log=monitor_log,
-                monitor_interval=monitor_interval,
-                tile_id=tile,
-            )
-            results.append(success)
-        except BaseException:
-            log.exception(
-                f"Cannot run {os.path.basename(path_ogr2ogr)} on tile {tile}"
+        command_laz = [path_lasmerge, "-i"]
+        command_laz.extend(input_las_files)
+        # FIXME: this doesnt work on windows
+        command_laz.extend(["-o", f"{out_dir}/{tile}.laz"])
+
+        def export(command):
+            exe_name = os.path.basename(command[0])
+            try:
+                # The two processes run at the same time, so their resource
+                # records are kept apart by the executable
+                return run_subprocess(
+                    command,
+                    doexec=doexec,
+                    monitor_log=monitor_log,
+                    monitor_interval=monitor_interval,
+                    tile_id=f"{tile}:{exe_name}",
+                )
+            except BaseException:
+                log.exception(f"Cannot run {exe_name} on tile {tile}")
+                return False
+
+        # The footprints come from the database and the point cloud from the
+        # file system, thus the two exports do not compete and can run at the
+        # same time
+        log.debug(
+            "Exporting footprints to GPKG and merging LAZ files:%s", tile
+        )
+        with ThreadPoolExecutor(
+            max_workers=2,
+            thread_name_prefix=f"{self.__class__.__name__}-{tile}",
+        ) as executor:
+            results = list(executor.map(export, (command_gpkg, command_laz)))
+        return all(results)
+
+
+@contextmanager
+def _resource_sampler(
+    pid: int,
+) -> Iterator[Callable[[], Tuple[float, float, int]]]:
+    """Provide a function that samples the resource usage of a running process.
+
+    On Linux `/proc/<pid>/stat` is opened once and re-read from the start on
+    each sample, on other platforms the values are queried through `psutil`.
+    The sample function returns the user CPU time [s], the system CPU time [s]
+    and the resident set size [bytes] of the process.
+    """
+    if _PROCFS:
+        fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+
+        def sample():
+            stat = os.pread(fd, 1024, 0)
+            # The executable name can contain spaces, thus split after its ")"
+            fields = stat.rsplit(b")", 1)[1].split()
+            return (
+                int(fields[11]) / _CLK_TCK,
+                int(fields[12]) / _CLK_TCK,
+                int(fields[21]) * _PAGESIZE,
             )
-            results.append(False)
 
-        log.debug(f"Merging LAZ files for:{tile}")
-        command = [path_lasmerge, "-i"]
-        command.extend(input_las_files)
-        # FIXME: this doesnt work on windows
-        command.extend(["-o", f"{out_dir}/{tile}.laz"])
         try:
-            success = run_subprocess(
-                command,
-                shell=False,
-                doexec=doexec,
-                monitor_log=monitor_log,
-                monitor_interval=monitor_interval,
-                tile_id=tile,
-            )
-            results.append(success)
-        except BaseException:
-            log.exception(
-                f"Cannot run {os.path.basename(path_lasmerge)} on tile {tile}"
-            )
-            results.append(False)
-        return all(results)
+            yield sample
+        finally:
+            os.close(fd)
+    else:
+        # psutil is only needed where there is no procfs
+        import psutil
+
+        process = psutil.Process(pid)
+
+        def sample():
+            cpu_times = process.cpu_times()
+            return cpu_times.user, cpu_times.system, process.memory_info().rss
+
+        yield sample
+
+
+def _monitor_ticks(popen: Popen, interval: float) -> Iterator[None]:
+    """Yield every `interval` seconds while the process is running.
+
+    The ticks are scheduled on the monotonic clock from the start, so the time
+    spent on sampling and a late wake-up do not shift the subsequent ticks. If
+    the sampling falls behind, the missed ticks are skipped.
+
+    Where available (Linux 5.3+), the process is watched through a pidfd, so
+    the iteration stops as soon as the process exits instead of at the end of
+    the current interval. Otherwise the process is polled after each interval.
+    """
+    try:
+        pidfd = os.pidfd_open(popen.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+
+    def timeouts():
+        deadline = monotonic()
+        while True:
+            deadline += interval
+            now = monotonic()
+            if deadline < now:
+                deadline = now
+            yield deadline - now
+
+    if pidfd is None:
+        for timeout in timeouts():
+            sleep(timeout)
+            if popen.poll() is not None:
+                return
+            yield
+    else:
+        try:
+            with selectors.DefaultSelector() as selector:
+                # The pidfd becomes readable when the process terminates
+                selector.register(pidfd, selectors.EVENT_READ)
+                for timeout in timeouts():
+                    if selector.select(timeout):
+                        return
+                    yield
+        finally:
+            os.close(pidfd)
+
+
+def _read_tail(stream: IO[str], tail: deque):
+    """Read the stream in chunks until EOF, keeping only the last
+    `tail.maxlen` chunks in `tail`."""
+    with stream:
+        for chunk in iter(lambda: stream.read(_TAIL_CHUNK_SIZE), ""):
+            tail.append(chunk)
+
+
+@lru_cache(maxsize=None)
+def _resolve_executable(executable: str) -> str:
+    """Resolve the executable to a path, by looking it up on the PATH if it is
+    only a name.
+
+    `subprocess.Popen` can only start the process with `os.posix_spawn` if the
+    executable has a directory component, otherwise it forks the worker.
+    The same few executables are run for every tile, thus the lookup is done
+    once per executable.
+    """
+    if os.path.dirname(executable):
+        return executable
+    return shutil.which(executable) or executable
 
 
 def run_subprocess(
     command: Sequence[str],
-    shell: bool = False,
     doexec: bool = True,
     monitor_log: logging.Logger = None,
     monitor_interval: int = 5,
     tile_id: str = None,
 ) -> bool:
-    """Runs a subprocess with `psutil.Popen` and monitors its status.
+    """Runs a subprocess with `subprocess.Popen` and monitors its status.
 
     If subprocess returns non-zero exit code, STDERR is sent to the log.
+    Only the tail (the last 256 KiB) of STDOUT and STDERR is kept.
 
-    :param command: The command to execute.
-    :param shell: Passed to `psutil.Popen`. Defaults to False.
+    :param command: The command to execute, as a sequence of the executable
+        and its arguments. It is not run through a shell.
     :param doexec: Do execute the subprocess or just print out the concatenated
         command. Used for testing.
     :param monitor_log: A resource logger, which is returned by
@@ -715,39 +828,59 @@ def run_subprocess(
     :return: True/False on success/failure
     """
     if doexec:
-        cmd = " ".join(command)
-        if shell:
-            command = cmd
-        log.debug(f"Tile {tile_id} command: {command}")
+        log.debug("Tile %s command: %s", tile_id, command)
         start = time()
-        popen = Popen(command, shell=shell, stderr=PIPE, stdout=PIPE)
+        command = [_resolve_executable(command[0]), *command[1:]]
+        # File descriptors are non-inheritable by default (PEP 446), thus
+        # close_fds=False does not leak them into the subprocess, but it lets
+        # Popen use posix_spawn instead of fork+exec
+        popen = Popen(
+            command,
+            stderr=PIPE,
+            stdout=PIPE,
+            close_fds=False,
+            encoding=_ENCODING,
+            errors="replace",
+        )
+        # Drain the pipes while the process runs, but only keep their tail,
+        # so that a verbose process cannot blow up the memory use of the
+        # worker
+        stdout_tail = deque(maxlen=_TAIL_CHUNKS)
+        stderr_tail = deque(maxlen=_TAIL_CHUNKS)
+        readers = [
+            Thread(target=_read_tail, args=(stream, tail), daemon=True)
+            for stream, tail in (
+                (popen.stdout, stdout_tail),
+                (popen.stderr, stderr_tail),
+            )
+        ]
+        for reader in readers:
+            reader.start()
         if monitor_log is not None:
-            while True:
-                sleep(monitor_interval)
-                monitor_log.info(
-                    f"{tile_id}\t{popen.pid}\t{popen.cpu_times().user}"
-                    f"\t{popen.memory_info().rss}"
-                )
-                if (
-                    not popen.is_running()
-                    or popen.status() == STATUS_ZOMBIE
-                    or popen.status() == STATUS_SLEEPING
-                ):
-                    break
-        stdout, stderr = popen.communicate()
-        err = stderr.decode(getpreferredencoding(do_setlocale=True))
-        out = stdout.decode(getpreferredencoding(do_setlocale=True))
+            # The process is not reaped until popen.wait(), so its /proc
+            # entry is readable on every tick
+            with _resource_sampler(popen.pid) as sample:
+                for _ in _monitor_ticks(popen, monitor_interval):
+                    monitor_log.info(
+                        _MONITOR_RECORD, tile_id, popen.pid, *sample()
+                    )
+        popen.wait()
+        for reader in readers:
+            reader.join()
         finish = time()
         log.info(f"Tile {tile_id} finished in {(finish-start)/60} minutes")
         if popen.returncode != 0:
             log.error(f"Tile {tile_id} process returned with {popen.returncode}")
         else:
-            log.debug(f"Tile {tile_id} process returned with {popen.returncode}")
-        log.debug(f"Tile {tile_id} stdout: \n{out}")
-        log.debug(f"Tile {tile_id} stderr: \n{err}")
+            log.debug(
+                "Tile %s process returned with %s", tile_id, popen.returncode
+            )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Tile %s stdout: \n%s", tile_id, "".join(stdout_tail))
+            log.debug("Tile %s stderr: \n%s", tile_id, "".join(stderr_tail))
         return True if popen.returncode == 0 else False
     else:
-        log.debug(f"Tile {tile_id} not executing {command}")
+        log.debug("Tile %s not executing %s", tile_id, command)
         return True
 
 